@@ -7,9 +7,18 @@ scraper functions. It should be executed by Streamlit, e.g.
 
 import streamlit as st
 
-from .scraper import scrape_seller_listings, create_download_file
+from .scraper import create_download_file, make_client, scrape_seller_listings
 
 
+@st.cache_resource
+def get_client():
+    """Share one HTTP client across Streamlit reruns.
+
+    Keeping the client (and its connection pool) alive between runs avoids
+    re-doing the TCP/TLS handshake for every scrape.
+    """
+    return make_client()
+
 
 def main() -> None:
     st.set_page_config(page_title="Kleinanzeigen Seller Scraper", page_icon="🔗")
@@ -37,7 +46,7 @@ def main() -> None:
         else:
             with st.spinner("Verarbeitung läuft …"):
                 try:
-                    links = scrape_seller_listings(url)
+                    links = scrape_seller_listings(url, client=get_client())
                 except Exception as e:
                     st.error(f"Fehler beim Abrufen der Daten: {e}")
                     return
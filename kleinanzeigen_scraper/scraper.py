@@ -2,74 +2,150 @@
 
 This module exposes helper functions used by the Streamlit app. They are
 designed to be imported independently, so unit tests can run without
-requiring Streamlit. All network calls use the `requests` library and a
-polite User‑Agent string.
+requiring Streamlit. All network calls use `httpx` (HTTP/2 with a
+persistent connection pool) and a polite User‑Agent string; pagination
+is fetched concurrently.
 """
 
 from __future__ import annotations
 
+import asyncio
 import math
 import re
-from urllib.parse import urljoin
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import httpx
 # Note: python-docx might not be installed in some contexts (e.g. tests). We
 # import Document lazily inside create_download_file to avoid mandatory
-# dependency during parsing and scraping.
+# dependency during parsing and scraping. selectolax and openpyxl are
+# likewise imported lazily where needed.
 
+# Listing hrefs on seller pages are server-rendered as plain double-quoted
+# attributes, so a precompiled regex over the raw HTML extracts them without
+# building a DOM at all. Fragments and query strings are excluded so that the
+# same listing always yields the same URL. The bytes variant runs directly on
+# the undecoded response body: charset detection plus utf-8 decoding of a
+# MB-sized page costs more than the scan itself, and the matched paths are
+# pure ASCII anyway.
+_HREF_RE = re.compile(r'href="(/s-anzeige/[^"#?]+)"')
+_HREF_BYTES = re.compile(rb'href="(/s-anzeige/[^"#?]+)"')
 
+# Base for turning the relative listing paths into absolute URLs. Plain
+# string concatenation suffices because the matched hrefs always begin with
+# "/s-anzeige/", so there is no need for urljoin to re-parse the base every
+# time.
+_BASE_HOST = "https://www.kleinanzeigen.de"
 
-def parse_listing_links(html: str) -> list[str]:
-    """Extract unique Kleinanzeigen listing URLs from a page's HTML.
+# The "<N> Anzeigen online" phrase sits in the seller header near the top of
+# the page. Compiled once at import, and as a bytes pattern so the raw
+# response body can be searched without decoding it first.
+_TOTAL_RE = re.compile(rb"(\d{1,5})\s+Anzeigen\s+online")
+
+# How far into the page to look for the total count. The seller header
+# appears well within the first 200 kB, so there is no point scanning the
+# full ~1 MB of listing markup below it.
+_TOTAL_SEARCH_WINDOW = 200_000
+
+
+
+def iter_listing_links(
+    html: str | bytes, strict: bool = False, seen: set[str] | None = None
+) -> Iterator[str]:
+    """Yield unique Kleinanzeigen listing URLs from a page's HTML.
 
     The seller overview pages contain many anchor tags, but we only want the
     individual listing links. Listing URLs include the sub‑path `/s-anzeige/` and
-    end with an ID pattern (e.g. `.../2801821674-223-8242`). This helper
-    identifies those anchors and returns absolute URLs.
+    end with an ID pattern (e.g. `.../2801821674-223-8242`). By default the
+    hrefs are pulled straight out of the raw HTML with a precompiled regex,
+    which skips DOM construction entirely; pass ``strict=True`` to parse the
+    page with a real HTML parser instead (e.g. should the markup ever change
+    in a way that trips up the regex). Raw response bytes are accepted
+    directly — only the short matched paths get decoded, never the page.
+
+    URLs are yielded one at a time as they are found, so callers can update
+    rolling state or pipeline the consumption without waiting for a full
+    list to materialize; :func:`parse_listing_links` wraps this when a list
+    is wanted.
 
     Args:
-        html: The raw HTML content of a seller page.
+        html: The raw HTML content of a seller page, as str or bytes.
+        strict: Use a full HTML parse instead of the regex fast path.
+        seen: Optional set of already-known URLs, updated in place. When
+            given, only URLs not yet in the set are yielded, so a caller
+            paging through a seller dedupes with one set in one pass.
 
-    Returns:
-        A list of absolute listing URLs (no duplicates) in the order they
-        appear.
+    Yields:
+        Absolute listing URLs (no duplicates, none of them in ``seen``) in
+        the order they appear.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    links: list[str] = []
-    seen: set[str] = set()
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
+    if seen is None:
+        seen = set()
+    if not strict:
+        if isinstance(html, bytes):
+            urls = (
+                _BASE_HOST + match.group(1).decode("ascii")
+                for match in _HREF_BYTES.finditer(html)
+            )
+        else:
+            urls = (
+                _BASE_HOST + match.group(1) for match in _HREF_RE.finditer(html)
+            )
+        for url in urls:
+            if url not in seen:
+                seen.add(url)
+                yield url
+        return
+
+    # Strict fallback: selectolax's Lexbor backend is an HTML5-tolerant C
+    # parser, so it copes with any markup the regex cannot.
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    # The attribute-substring selector filters inside the C engine, so the
+    # ~90% of anchors that are not listing links never reach Python.
+    for a in tree.css("a[href*='/s-anzeige/']"):
+        href = a.attributes.get("href")
         if not href:
             continue
-        # Accept only listing links containing the Kleinanzeigen listing path.
-        if "/s-anzeige/" in href:
-            # Ensure full URL
-            full_url = href
-            if not href.startswith("http"):
-                full_url = urljoin("https://www.kleinanzeigen.de", href)
-            # Only record unique entries
-            if full_url not in seen:
-                seen.add(full_url)
-                links.append(full_url)
-    return links
-
-
-def extract_total_count(html: str) -> int | None:
+        # Ensure full URL
+        full_url = href if href.startswith("http") else _BASE_HOST + href
+        # Only record unique entries
+        if full_url not in seen:
+            seen.add(full_url)
+            yield full_url
+
+
+def parse_listing_links(
+    html: str | bytes, strict: bool = False, seen: set[str] | None = None
+) -> list[str]:
+    """Extract unique Kleinanzeigen listing URLs from a page's HTML.
+
+    List-returning wrapper around :func:`iter_listing_links`, kept for
+    callers that want the page's links materialized in one go; see there for
+    the parameter semantics.
+    """
+    return list(iter_listing_links(html, strict=strict, seen=seen))
+
+
+def extract_total_count(html: str | bytes) -> int | None:
     """Attempt to extract the number of active ads from the seller page.
 
     The number of active ads appears near the seller description as a German
-    phrase like "1489 Anzeigen online". This function uses a regular
-    expression to locate such a number.
+    phrase like "1489 Anzeigen online". A precompiled bytes regex locates the
+    number, so the raw response body can be passed in directly without paying
+    for charset detection or decoding; only the top of the page is scanned,
+    since the phrase always sits in the seller header.
 
     Args:
-        html: The HTML content of the seller page.
+        html: The HTML content of the seller page, as str or raw bytes.
 
     Returns:
         The integer count of active ads or None if not found.
     """
-    match = re.search(r"(\d{1,5})\s+Anzeigen\s+online", html)
+    if isinstance(html, str):
+        html = html.encode("utf-8", errors="replace")
+    match = _TOTAL_RE.search(html[:_TOTAL_SEARCH_WINDOW])
     if match:
         try:
             return int(match.group(1))
@@ -78,70 +154,241 @@ def extract_total_count(html: str) -> int | None:
     return None
 
 
-def scrape_seller_listings(base_url: str) -> list[str]:
-    """Scrape all listing URLs from a Kleinanzeigen seller profile.
+def parse_page(
+    html: str | bytes, with_total: bool = False, seen: set[str] | None = None
+) -> tuple[list[str], int | None]:
+    """Parse one seller page in a single pass over its HTML.
 
-    This function iterates through paginated seller pages using the German
-    `seite` query parameter. It stops once either the expected number of
-    pages has been processed or no new listings are found. A polite User‑Agent
-    header helps to avoid simple blocks.
+    Link extraction and total-count detection used to run as separate passes
+    over separately prepared payloads; fusing them here means the page is
+    traversed once, straight off the raw response bytes. Only the first page
+    carries the total, so subsequent pages skip that scan entirely.
 
     Args:
-        base_url: The seller's profile URL (e.g.
-            "https://www.kleinanzeigen.de/pro/ff-wheels-by-felgenforum"). The
-            function will strip any existing query parameters and build new
-            ones as needed.
+        html: The raw HTML content of a seller page, as str or bytes.
+        with_total: Also scan for the "Anzeigen online" total (page 1 only).
+        seen: Optional set of already-known URLs, updated in place (see
+            :func:`parse_listing_links`).
 
     Returns:
-        A list of all unique listing URLs published by the seller.
+        A tuple of (listing links, total ad count or None).
     """
-    # Remove any existing query parameters from the URL
-    if "?" in base_url:
-        base_url = base_url.split("?")[0]
+    links = parse_listing_links(html, seen=seen)
+    total = extract_total_count(html) if with_total else None
+    return links, total
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/115.0 Safari/537.36"
+
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/115.0 Safari/537.36"
+    ),
+    # Ask explicitly for compressed responses; seller pages compress ~5-10x,
+    # so this saves most of the bytes on the wire. Brotli support comes from
+    # the brotli package in requirements.
+    "Accept-Encoding": "gzip, deflate, br",
+}
+
+
+# Connection pool sizing shared by the sync and async clients. HTTP/2 lets
+# many page requests multiplex over a single TLS session, so TCP+TLS
+# handshakes are paid once instead of per request.
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=20)
+
+# Hard cap on concurrently in-flight page requests. This guards the origin
+# against a flood if the page estimate is ever wrong, independent of the
+# connection pool size.
+_MAX_IN_FLIGHT = 8
+
+
+async def _fetch(client: httpx.AsyncClient, url: str) -> bytes | None:
+    """Fetch a single page, returning its raw HTML or None on a non‑OK status."""
+    resp = await client.get(url)
+    if resp.status_code != 200:
+        return None
+    return resp.content
+
+
+async def _scrape_async(base_url: str) -> list[str]:
+    """Asynchronous implementation behind :func:`scrape_seller_listings`."""
+    async with httpx.AsyncClient(
+        http2=True, headers=_HEADERS, timeout=15, limits=_LIMITS
+    ) as client:
+        # Fetch the first page to determine total count and gather links
+        resp = await client.get(base_url)
+        resp.raise_for_status()
+        # One rolling set dedupes both within and across pages; it is seeded
+        # at page 1 and handed to every subsequent parse.
+        all_links_set: set[str] = set()
+        all_links, total_ads = parse_page(
+            resp.content, with_total=True, seen=all_links_set
         )
-    }
 
-    session = requests.Session()
-    session.headers.update(headers)
+        # Estimate number of pages (25 ads per page) if we know the total count.
+        num_pages = None
+        if total_ads:
+            num_pages = math.ceil(total_ads / 25)
+
+        if num_pages:
+            # The first page told us how many pages exist, so the rest can be
+            # fetched concurrently instead of paying one RTT per page. A
+            # semaphore bounds the in-flight requests, and pages are consumed
+            # as they complete so we can stop (and cancel the remainder) as
+            # soon as the seller's advertised total has been collected.
+            sem = asyncio.Semaphore(_MAX_IN_FLIGHT)
 
+            async def fetch_limited(url: str) -> bytes | None:
+                async with sem:
+                    return await _fetch(client, url)
+
+            loop = asyncio.get_running_loop()
+            tasks = [
+                asyncio.create_task(fetch_limited(f"{base_url}?seite={page}"))
+                for page in range(2, num_pages + 1)
+            ]
+            try:
+                for future in asyncio.as_completed(tasks):
+                    html = await future
+                    if html is None:
+                        continue
+                    # Run the regex scan in the default thread pool so the
+                    # event loop keeps feeding the open sockets while a page
+                    # is being parsed. Parses stay serialized (each one is
+                    # awaited), so sharing the seen set remains safe.
+                    new_links = await loop.run_in_executor(
+                        None, parse_listing_links, html, False, all_links_set
+                    )
+                    all_links.extend(new_links)
+                    if len(all_links_set) >= total_ads:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        else:
+            # Unknown total: fall back to sequential paging until a page
+            # yields nothing new.
+            page = 2
+            while True:
+                html = await _fetch(client, f"{base_url}?seite={page}")
+                if html is None:
+                    break
+                new_links = parse_listing_links(html, seen=all_links_set)
+                if not new_links:
+                    break
+                all_links.extend(new_links)
+                page += 1
+    return all_links
+
+
+def make_client() -> httpx.Client:
+    """Create an httpx client configured for scraping Kleinanzeigen.
+
+    Exposed so callers (e.g. the Streamlit app via ``st.cache_resource``)
+    can keep one client alive across invocations and reuse its warm
+    connection pool instead of re-handshaking every run.
+    """
+    return httpx.Client(http2=True, headers=_HEADERS, timeout=15, limits=_LIMITS)
+
+
+def _scrape_threaded(base_url: str, client: httpx.Client | None = None) -> list[str]:
+    """Thread-based implementation behind :func:`scrape_seller_listings`.
+
+    Used when a client is supplied by the caller or when an asyncio event
+    loop is already running in the calling thread (where ``asyncio.run``
+    would fail). Page fetches are I/O-bound, so a small thread pool achieves
+    the same wall-clock win as the async path.
+    """
+    if client is None:
+        with make_client() as own_client:
+            return _scrape_threaded(base_url, own_client)
     # Fetch the first page to determine total count and gather links
-    resp = session.get(base_url, timeout=15)
+    resp = client.get(base_url)
     resp.raise_for_status()
-    first_html = resp.text
-    all_links: list[str] = parse_listing_links(first_html)
-    total_ads = extract_total_count(first_html)
+    # One rolling set dedupes both within and across pages; it is seeded at
+    # page 1 and handed to every subsequent parse.
+    all_links_set: set[str] = set()
+    all_links, total_ads = parse_page(
+        resp.content, with_total=True, seen=all_links_set
+    )
 
     # Estimate number of pages (25 ads per page) if we know the total count.
     num_pages = None
     if total_ads:
         num_pages = math.ceil(total_ads / 25)
 
-    # Loop through subsequent pages until no new links or page limit is reached.
-    page = 2
-    while True:
-        if num_pages and page > num_pages:
-            break
-        page_url = f"{base_url}?seite={page}"
-        r = session.get(page_url, timeout=15)
-        # Break if we receive a non‑OK status
+    def fetch(url: str) -> bytes | None:
+        r = client.get(url)
         if r.status_code != 200:
-            break
-        links = parse_listing_links(r.text)
-        # Stop if no new links are found
-        new_links = [url for url in links if url not in all_links]
-        if not new_links:
-            break
-        all_links.extend(new_links)
-        page += 1
+            return None
+        return r.content
+
+    if num_pages:
+        urls = [f"{base_url}?seite={page}" for page in range(2, num_pages + 1)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            # executor.map preserves page order, so the result list keeps the
+            # same ordering as the sequential loop did.
+            for html in executor.map(fetch, urls):
+                if html is None:
+                    continue
+                new_links = parse_listing_links(html, seen=all_links_set)
+                all_links.extend(new_links)
+    else:
+        # Unknown total: fall back to sequential paging until a page yields
+        # nothing new.
+        page = 2
+        while True:
+            html = fetch(f"{base_url}?seite={page}")
+            if html is None:
+                break
+            new_links = parse_listing_links(html, seen=all_links_set)
+            if not new_links:
+                break
+            all_links.extend(new_links)
+            page += 1
     return all_links
 
 
+def scrape_seller_listings(
+    base_url: str, client: httpx.Client | None = None
+) -> list[str]:
+    """Scrape all listing URLs from a Kleinanzeigen seller profile.
+
+    This function pages through the seller's adverts using the German `seite`
+    query parameter. The first page reveals the total ad count, so all
+    remaining pages are fetched concurrently; without a total it falls back
+    to sequential paging until no new listings are found. A polite
+    User‑Agent header helps to avoid simple blocks.
+
+    Args:
+        base_url: The seller's profile URL (e.g.
+            "https://www.kleinanzeigen.de/pro/ff-wheels-by-felgenforum"). The
+            function will strip any existing query parameters and build new
+            ones as needed.
+        client: Optional long-lived httpx client (see :func:`make_client`).
+            When given, its connection pool is reused across calls and the
+            client is left open for the caller to manage.
+
+    Returns:
+        A list of all unique listing URLs published by the seller.
+    """
+    # Remove any existing query parameters from the URL
+    if "?" in base_url:
+        base_url = base_url.split("?")[0]
+    if client is not None:
+        # A sync client cannot be driven from the async path (and keeping it
+        # warm across asyncio.run loops would not work anyway).
+        return _scrape_threaded(base_url, client)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_scrape_async(base_url))
+    # A loop is already running in this thread (e.g. when embedded in an
+    # async framework), so asyncio.run is unavailable; use threads instead.
+    return _scrape_threaded(base_url)
+
+
 def create_download_file(links: list[str], file_type: str) -> tuple[str, bytes]:
     """Generate a downloadable file from the list of links.
 
@@ -158,14 +405,25 @@ def create_download_file(links: list[str], file_type: str) -> tuple[str, bytes]:
         content = "\n".join(links)
         return "text/plain", content.encode("utf-8")
     elif file_type == "csv":
-        df = pd.DataFrame({"Listing URL": links})
-        csv_str = df.to_csv(index=False)
+        # A single column of URLs needs no CSV quoting (listing URLs contain
+        # neither commas nor quotes), so write it directly instead of going
+        # through a pandas DataFrame.
+        csv_str = "\n".join(["Listing URL", *links])
         return "text/csv", csv_str.encode("utf-8")
     elif file_type == "xlsx":
-        df = pd.DataFrame({"Listing URL": links})
+        # openpyxl's write-only mode streams rows straight to the file
+        # instead of keeping a whole worksheet (or DataFrame) in memory.
         import io
+
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(["Listing URL"])
+        for link in links:
+            ws.append([link])
         buffer = io.BytesIO()
-        df.to_excel(buffer, index=False, engine="openpyxl")
+        wb.save(buffer)
         buffer.seek(0)
         return (
             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
@@ -182,10 +440,29 @@ def create_download_file(links: list[str], file_type: str) -> tuple[str, bytes]:
                 "python-docx ist nicht installiert. Bitte fügen Sie es zu Ihren "
                 "Abhängigkeiten hinzu, wenn Sie das DOCX-Format verwenden möchten."
             )
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import qn
+        from xml.sax.saxutils import escape
+
         doc = Document()
         doc.add_heading("Kleinanzeigen Listing Links", level=1)
-        for link in links:
-            doc.add_paragraph(link, style="BodyText")
+        # doc.add_paragraph mutates the document tree once per link, which
+        # dominates docx creation time for large sellers. Build all paragraph
+        # elements from one XML string instead and splice them into the body
+        # in a single batch (before the trailing sectPr, where paragraphs
+        # belong).
+        w_ns = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+        paragraphs_xml = "".join(
+            f"<w:p><w:r><w:t>{escape(link)}</w:t></w:r></w:p>" for link in links
+        )
+        batch = parse_xml(f"<w:body {w_ns}>{paragraphs_xml}</w:body>")
+        body = doc.element.body
+        sect_pr = body.find(qn("w:sectPr"))
+        for paragraph in list(batch):
+            if sect_pr is not None:
+                sect_pr.addprevious(paragraph)
+            else:
+                body.append(paragraph)
         import io
         buffer = io.BytesIO()
         doc.save(buffer)